@@ -0,0 +1,78 @@
+"""
+Benchmark for local_search.py
+Builds an index over a synthetic corpus, then times saving, loading and queries.
+
+Run it with:  python bench_local_search.py [number_of_docs]
+"""
+
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from local_search import LocalSearchIndex
+
+
+def make_corpus(n_docs, vocab_size=20000, words_per_doc=300, seed=42):
+    """Random documents whose word frequencies roughly follow Zipf's law"""
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(vocab_size)]
+    weights = [1 / (rank + 1) for rank in range(vocab_size)]
+    for i in range(n_docs):
+        words = rng.choices(vocab, weights=weights, k=words_per_doc)
+        yield f"https://example.com/doc-{i}", f"Document {i}", " ".join(words)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(n_docs=20000, n_queries=500):
+    index_dir = tempfile.mkdtemp(prefix="bench_index_")
+    try:
+        corpus = list(make_corpus(n_docs))
+        index = LocalSearchIndex(index_dir)
+
+        start = time.perf_counter()
+        for url, title, text in corpus:
+            index.add_document(url, title, text)
+        build_time = time.perf_counter() - start
+        print(f"Build:  {n_docs} docs in {build_time:.2f}s ({n_docs / build_time:,.0f} docs/s)")
+
+        start = time.perf_counter()
+        index.save()
+        print(f"Save:   {time.perf_counter() - start:.2f}s")
+        index.close()
+
+        start = time.perf_counter()
+        index = LocalSearchIndex(index_dir)
+        index.load()
+        print(f"Load:   {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        # Mix of common and rare terms, 1-3 words per query
+        rng = random.Random(7)
+        queries = [" ".join(f"word{rng.randint(0, 2000)}" for _ in range(rng.randint(1, 3)))
+                   for _ in range(n_queries)]
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"Query:  p50 {percentile(timings, 50):.2f}ms  "
+              f"p95 {percentile(timings, 95):.2f}ms  max {max(timings):.2f}ms")
+
+        # Incremental update: add a few docs on top of the mmapped segment
+        start = time.perf_counter()
+        for url, title, text in make_corpus(100, seed=99):
+            index.add_document(url + "-new", title, text)
+        index.save()
+        print(f"Add 100 docs + save: {time.perf_counter() - start:.2f}s")
+        index.close()
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,232 @@
+"""
+Check fetch_page.py against a local web server
+Serves the pages in fixtures/pages/ on localhost and checks that fetching,
+connection reuse, size limits, redirects and cache revalidation all work.
+No internet connection needed.
+
+Run it with:  python check_fetch_page.py
+"""
+
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from fetch_page import PageFetcher, is_public_address
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serves fixture files with gzip and keep-alive, plus a few special paths.
+    HTML pages get an ETag and text files a Last-Modified date, so both kinds
+    of revalidation are exercised.
+    """
+
+    protocol_version = "HTTP/1.1"   # keep-alive, so the fetcher can reuse connections
+    connections_seen = set()
+    not_modified = 0
+    huge_conditional_requests = 0
+
+    def do_GET(self):
+        FixtureHandler.connections_seen.add(self.client_address)
+
+        if self.path == "/redirect":
+            return self.send_body(301, b"", "text/plain", {"Location": "/python_decorators.html"})
+        if self.path == "/huge.html":
+            if "If-None-Match" in self.headers:
+                FixtureHandler.huge_conditional_requests += 1
+            body = b"<html><body>" + b"<p>Endless filler text for a very large page.</p>" * 100000
+            return self.send_body(200, body, "text/html; charset=utf-8", {"ETag": '"huge"'})
+
+        if self.path == "/slow.html":
+            return self.send_slowly()
+        if self.path == "/hang.html":
+            time.sleep(5)   # never answers in time
+        if self.path == "/delayed.txt":
+            time.sleep(1.5)   # slow to start, then a normal page
+            self.path = "/git_branches.txt"
+
+        path = os.path.join(FIXTURES_DIR, os.path.basename(self.path))
+        if not os.path.isfile(path):
+            return self.send_body(404, b"Not found", "text/plain")
+
+        with open(path, "rb") as f:
+            body = f.read()
+        if path.endswith(".html"):
+            content_type = "text/html; charset=utf-8"
+            headers = {"ETag": '"' + hashlib.sha1(body).hexdigest() + '"'}
+            unchanged = self.headers.get("If-None-Match") == headers["ETag"]
+        else:
+            content_type = "text/plain; charset=utf-8"
+            headers = {"Last-Modified": formatdate(os.path.getmtime(path), usegmt=True)}
+            unchanged = self.headers.get("If-Modified-Since") == headers["Last-Modified"]
+        if unchanged:
+            FixtureHandler.not_modified += 1
+            return self.send_body(304, b"", None, headers)
+
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        self.send_body(200, body, content_type, headers)
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass   # the fetcher stopped reading early (size cap)
+
+    def send_slowly(self):
+        """A page that trickles out one small piece every 0.2 seconds"""
+        piece = b"<p>slow words</p>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(piece) * 1000))
+        self.end_headers()
+        try:
+            for _ in range(1000):
+                self.wfile.write(piece)
+                self.wfile.flush()
+                time.sleep(0.2)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass   # keep the output readable
+
+
+class OldFixtureHandler(FixtureHandler):
+    """The same pages over HTTP/1.0, where the server closes every connection"""
+
+    protocol_version = "HTTP/1.0"
+
+
+def check(condition, message):
+    print(f"{'✓' if condition else '✗'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def run():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    old_server = ThreadingHTTPServer(("127.0.0.1", 0), OldFixtureHandler)
+    threading.Thread(target=old_server.serve_forever, daemon=True).start()
+    old_base = f"http://127.0.0.1:{old_server.server_port}"
+    # The test server lives on 127.0.0.1, which the fetcher refuses by default
+    fetcher = PageFetcher(max_bytes=256 * 1024, allow_private=True)
+
+    try:
+        # 1. Main text extraction and passage selection
+        page = fetcher.fetch(base + "/python_decorators.html", "how to write a decorator with functools wraps")
+        text = " ".join(page["passages"])
+        check(page["title"] == "Python Decorators Explained", "title extracted")
+        check("functools.wraps" in text, "relevant passage returned")
+        check("analytics" not in text and "newsletter" not in text and "Copyright" not in text,
+              "scripts, navigation, sidebars and footers skipped")
+
+        # 2. Plain text pages
+        page = fetcher.fetch(base + "/git_branches.txt", "create a branch")
+        check(any("git switch -c" in p for p in page["passages"]), "plain text page fetched")
+
+        # 3. Cache revalidation: second fetches get a 304 and reuse the cached page
+        page = fetcher.fetch(base + "/python_decorators.html", "decorator")
+        check(FixtureHandler.not_modified == 1 and page["title"] == "Python Decorators Explained",
+              "cached page served after 304 Not Modified (ETag)")
+        page = fetcher.fetch(base + "/git_branches.txt", "create a branch")
+        check(FixtureHandler.not_modified == 2 and any("git switch -c" in p for p in page["passages"]),
+              "cached page served after 304 Not Modified (Last-Modified)")
+
+        # 4. Connection reuse: many fetches, only a few connections
+        FixtureHandler.connections_seen.clear()
+        for _ in range(10):
+            fetcher.fetch(base + "/git_branches.txt", "merge")
+        check(len(FixtureHandler.connections_seen) == 1,
+              f"10 sequential fetches used {len(FixtureHandler.connections_seen)} connection(s)")
+
+        # 5. Size cap: the page is cut off, flagged, and never cached
+        page = fetcher.fetch(base + "/huge.html", "filler")
+        check(page.get("truncated") is True and page["passages"],
+              "oversized page cut off at the size limit instead of failing")
+        check(fetcher.fetch(base + "/git_branches.txt", "merge")["truncated"] is False,
+              "small pages are not marked as truncated")
+        fetcher.fetch(base + "/huge.html", "filler")
+        check(FixtureHandler.huge_conditional_requests == 0, "truncated page not cached for revalidation")
+
+        # 6. Redirects, errors and parallel fetching
+        urls = [base + "/redirect", base + "/missing.html", base + "/git_branches.txt"]
+        pages = fetcher.fetch_many(urls, "branch")
+        check(pages[0].get("title") == "Python Decorators Explained", "redirect followed")
+        check("404" in pages[1].get("error", ""), "missing page reported as an error")
+        check([page["url"] for page in pages] == urls
+              and any("git switch" in p for p in pages[2].get("passages", [])),
+              "results come back in the order requested")
+
+        # 7. Slow servers hit the per-page deadline instead of stalling the agent
+        slow_fetcher = PageFetcher(deadline=1, allow_private=True)
+        start = time.monotonic()
+        page = slow_fetcher.fetch(base + "/slow.html", "words")
+        slow_fetcher.close()
+        check("error" in page and time.monotonic() - start < 3,
+              f"slow page abandoned after {time.monotonic() - start:.1f}s")
+
+        # ...and so do servers that never send their headers
+        slow_fetcher = PageFetcher(deadline=1, allow_private=True)
+        start = time.monotonic()
+        page = slow_fetcher.fetch(base + "/hang.html", "words")
+        slow_fetcher.close()
+        check("error" in page and time.monotonic() - start < 2,
+              f"silent server abandoned after {time.monotonic() - start:.1f}s")
+
+        # A timeout shortened by one page's deadline isn't left on the pooled connection:
+        # the first fetch ends with ~0.5s left, the second needs 1.5s on the same connection
+        slow_fetcher = PageFetcher(deadline=2, allow_private=True)
+        FixtureHandler.connections_seen.clear()
+        pages = [slow_fetcher.fetch(base + "/delayed.txt", "branch") for _ in range(2)]
+        slow_fetcher.close()
+        check(all("passages" in page for page in pages) and len(FixtureHandler.connections_seen) == 1,
+              "reused connection gets a fresh timeout")
+
+        # 8. By default only public internet addresses are fetched
+        default_fetcher = PageFetcher()
+        page = default_fetcher.fetch(base + "/python_decorators.html", "decorator")
+        default_fetcher.close()
+        check("non-public address" in page.get("error", ""), "localhost refused by default")
+        check(not any(is_public_address(ip) for ip in
+                      ["10.0.0.1", "192.168.1.1", "169.254.169.254", "::1", "::ffff:127.0.0.1"])
+              and is_public_address("8.8.8.8"), "private, link-local and loopback addresses rejected")
+
+        # 9. Servers that close the connection after each response (HTTP/1.0, Connection: close)
+        pages = fetcher.fetch_many([old_base + "/python_decorators.html", old_base + "/git_branches.txt",
+                                    old_base + "/huge.html"], "branch")
+        check(pages[0].get("title") == "Python Decorators Explained" and "passages" in pages[1]
+              and pages[2].get("truncated") is True, "HTTP/1.0 pages fetched")
+
+        # 10. Malformed URLs from the model become per-URL errors, not crashes
+        bad_urls = ["http://example.com:abc/", "http://[::1/", "ftp://example.com/",
+                    "http://" + "a" * 70 + ".com/"]
+        pages = fetcher.fetch_many(bad_urls, "anything")
+        check(all("error" in page for page in pages), "malformed URLs reported as errors")
+    finally:
+        fetcher.close()
+        server.shutdown()
+        old_server.shutdown()
+
+    print("\nAll fetch_page checks passed")
+
+
+if __name__ == "__main__":
+    run()
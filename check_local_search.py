@@ -0,0 +1,153 @@
+"""
+Check local_search.py on a small throwaway corpus
+Builds an index in a temp folder and checks saving and loading, incremental
+re-indexing, deleted and removed files, that a half-finished save can't
+corrupt the index, and where CONFIDENT_SCORE sits on a realistic corpus.
+
+Run it with:  python check_local_search.py
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from local_search import CONFIDENT_SCORE, LocalSearchIndex, is_confident, open_index
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def check(condition, message):
+    print(f"{'✓' if condition else '✗'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def write(path, content, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.utime(path, (mtime, mtime))   # explicit mtimes, so no sleeping between edits
+
+
+def urls(results):
+    return [os.path.basename(r["url"]) for r in results]
+
+
+def run():
+    work_dir = tempfile.mkdtemp(prefix="check_local_search_")
+    corpus = os.path.join(work_dir, "docs")
+    index_dir = os.path.join(work_dir, "index")
+    os.makedirs(corpus)
+
+    try:
+        write(os.path.join(corpus, "lists.md"), "# Python Lists\nA list comprehension builds a list.\n", 1000)
+        write(os.path.join(corpus, "git.md"), "# Git Branches\nUse git switch to change branches.\n", 1000)
+        write(os.path.join(corpus, "loops.txt"), "Loops\nA for loop repeats code for each item.\n", 1000)
+
+        # 1. Build, save, and load into a fresh object
+        index = LocalSearchIndex(index_dir)
+        check(index.add_directory(corpus) == (3, 0), "3 files indexed on the first build")
+        before = index.search("list comprehension")
+        index.save()
+        index.close()
+
+        index = LocalSearchIndex(index_dir)
+        check(index.load() and index.search("list comprehension") == before,
+              "same results after save and load")
+
+        # 2. Re-running the build only touches changed files
+        check(index.add_directory(corpus) == (0, 0), "unchanged files are skipped")
+        write(os.path.join(corpus, "lists.md"), "# Python Tuples\nTuples are immutable sequences.\n", 2000)
+        check(index.add_directory(corpus) == (1, 0), "file with a new mtime is re-indexed")
+
+        # 3. The old version is gone straight away, even before saving
+        check(index.search("comprehension") == [], "replaced version excluded before save")
+        check(urls(index.search("immutable tuples")) == ["lists.md"], "new version searchable before save")
+
+        # 4. Removed files disappear too
+        os.remove(os.path.join(corpus, "loops.txt"))
+        check(index.add_directory(corpus) == (0, 1), "removed file is dropped from the index")
+        check(index.search("loop") == [], "removed file no longer returned")
+
+        # 5. Saving compacts: no deleted documents left on disk or in memory
+        index.save()
+        index.close()
+        index = LocalSearchIndex(index_dir)
+        index.load()
+        with open(os.path.join(index_dir, "docs.json"), encoding="utf-8") as f:
+            saved = json.load(f)
+        check(len(saved["docs"]) == 2 and not index.deleted, "save() drops deleted documents")
+        check(urls(index.search("git branches")) == ["git.md"]
+              and urls(index.search("immutable")) == ["lists.md"], "renumbered documents still found")
+        generation = index.generation
+        check(sorted(os.listdir(index_dir)) == ["docs.json", f"lexicon.{generation}.json",
+                                                f"postings.{generation}.bin"],
+              "old generations cleaned up")
+
+        # 6. A save that crashes before docs.json is written leaves the old index working
+        with open(os.path.join(index_dir, f"postings.{generation + 1}.bin"), "wb") as f:
+            f.write(b"half written")
+        index.close()
+        index = open_index(index_dir)
+        check(index is not None and urls(index.search("git")) == ["git.md"],
+              "interrupted save doesn't affect the live index")
+        index.close()
+
+        # 7. A postings file that doesn't match docs.json is refused, not silently misread
+        with open(os.path.join(index_dir, f"postings.{generation}.bin"), "r+b") as f:
+            f.truncate(8)
+        check(open_index(index_dir) is None, "truncated postings file detected")
+
+        # 8. LOCAL_SEARCH_INDEX is read when the index is created, not at import time
+        os.environ["LOCAL_SEARCH_INDEX"] = index_dir
+        try:
+            check(LocalSearchIndex().index_dir == index_dir, "LOCAL_SEARCH_INDEX picked up after import")
+        finally:
+            del os.environ["LOCAL_SEARCH_INDEX"]
+
+        # 9. HTML pages: entities decoded, scripts and navigation left out
+        page = os.path.join(work_dir, "page.html")
+        write(page, "<html><head><title>Tips &amp; Tricks</title><script>var tracking = 1;</script></head>"
+                    "<body><nav>Home About Contact Blog</nav>"
+                    "<p>Compare with &lt;=, quote with &quot;double&quot; or &#39;single&#39; marks.</p>"
+                    "</body></html>", 1000)
+        index = LocalSearchIndex(os.path.join(work_dir, "html_index"))
+        index.add_file(page)
+        result = index.search("quote marks")[0]
+        check(result["title"] == "Tips & Tricks" and "&" not in result["snippet"]
+              and '<=, quote with "double" or \'single\'' in result["snippet"], "HTML entities decoded")
+        check(index.search("tracking") == [] and index.search("contact") == [],
+              "scripts and navigation not indexed")
+
+        # 10. Confidence: exact-topic hits clear CONFIDENT_SCORE, generic word overlap doesn't
+        corpus = os.path.join(work_dir, "realistic")
+        shutil.copytree(os.path.join(REPO_DIR, "fixtures", "pages"), corpus)
+        shutil.copy(os.path.join(REPO_DIR, "README.md"), corpus)
+        index = LocalSearchIndex(os.path.join(work_dir, "realistic_index"))
+        index.add_directory(corpus)
+        for query, expected in [("python decorators", "python_decorators.html"),
+                                ("git branches", "git_branches.txt")]:
+            best = index.search(query)[0]
+            check(os.path.basename(best["url"]) == expected and best["confidence"] >= CONFIDENT_SCORE,
+                  f"'{query}' is a confident hit ({best['confidence']})")
+        for query in ["gemini api key error", "latest ai news this week"]:
+            best = index.search(query)[0]
+            check(best["confidence"] < CONFIDENT_SCORE,
+                  f"'{query}' is not confident enough to skip the web ({best['confidence']})")
+
+        # One-word queries score high on any page that uses the word a lot,
+        # so they never skip the web on their own
+        for query in ["python", "git"]:
+            best = index.search(query)[0]
+            check(not is_confident(best, query),
+                  f"one-word query '{query}' still goes to the web ({best['confidence']})")
+        best = index.search("git branches")[0]
+        check(is_confident(best, "git branches"), "two-word exact-topic query skips the web")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\nAll local_search checks passed")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,429 @@
+"""
+Fetch Page - Read the pages behind search results
+web_search only gives the model short snippets. This tool downloads the
+result pages, pulls out the main text and sends back only the passages
+that are most relevant to the question.
+
+- Connections are pooled and reused per host (HTTP keep-alive)
+- Several pages are fetched at once, with a cap on how many run in parallel
+- Bodies are streamed and cut off at MAX_PAGE_BYTES
+- Text is extracted while streaming, without building a DOM
+- Pages are cached and revalidated with ETag / Last-Modified
+- URLs come from the model, so only public internet addresses are fetched
+  and every page has an overall time limit
+
+Try it:  python fetch_page.py "python decorators" https://docs.python.org/3/glossary.html
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+import codecs
+import http.client
+import ipaddress
+import json
+import socket
+import sys
+import threading
+import time
+import zlib
+
+from text_tools import TextExtractor, bm25_idf, bm25_term_score, tokenize
+
+# Fetch limits
+MAX_PAGE_BYTES = 2 * 1024 * 1024   # stop reading a page after 2 MB
+READ_CHUNK_BYTES = 16 * 1024
+TIMEOUT_SECONDS = 10                # per connect / read
+PAGE_DEADLINE_SECONDS = 20          # whole page, including redirects
+MAX_REDIRECTS = 3
+MAX_PARALLEL_FETCHES = 4
+MAX_IDLE_CONNECTIONS_PER_HOST = 2
+
+# What we send back to the model
+PASSAGE_CHARS = 700
+PASSAGES_PER_PAGE = 3
+
+# How many pages the content cache remembers
+CACHE_SIZE = 64
+
+USER_AGENT = "TechAssistantAgent/1.0 (+https://github.com/lidiadelacruz/ai-agent-workshop)"
+
+
+class FetchError(Exception):
+    """A page could not be fetched"""
+
+
+# ----- passage selection -----
+
+def split_passages(paragraphs, max_chars=PASSAGE_CHARS):
+    """Group consecutive paragraphs into passages of roughly max_chars"""
+    passages = []
+    current = ""
+    for paragraph in paragraphs:
+        # Split paragraphs that are too long on their own
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                passages.append(current)
+                current = ""
+            passages.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+        if current and len(current) + len(paragraph) + 1 > max_chars:
+            passages.append(current)
+            current = ""
+        current = f"{current} {paragraph}".strip()
+    if current:
+        passages.append(current)
+    return passages
+
+
+def top_passages(passages, query, limit=PASSAGES_PER_PAGE):
+    """Pick the passages that best match the query (BM25), kept in page order"""
+    query_terms = set(tokenize(query))
+    if not query_terms or len(passages) <= limit:
+        return passages[:limit]
+
+    passage_terms = [tokenize(p) for p in passages]
+    avg_length = sum(len(terms) for terms in passage_terms) / len(passages) or 1
+    doc_freq = {term: sum(1 for terms in passage_terms if term in terms)
+                for term in query_terms}
+
+    idf = {term: bm25_idf(len(passages), doc_freq[term]) for term in query_terms}
+
+    scores = []
+    for terms in passage_terms:
+        score = 0.0
+        for term in query_terms:
+            tf = terms.count(term)
+            if tf:
+                score += bm25_term_score(tf, idf[term], len(terms), avg_length)
+        scores.append(score)
+
+    best = sorted(range(len(passages)), key=lambda i: scores[i], reverse=True)[:limit]
+    return [passages[i] for i in sorted(best)]
+
+
+# ----- connection pool -----
+
+def is_public_address(ip):
+    """False for loopback, private, link-local (e.g. cloud metadata) and other non-internet addresses"""
+    address = ipaddress.ip_address(ip.split("%")[0])
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+
+def connect_public_only(address, *args, **kwargs):
+    """
+    socket.create_connection, but refuses non-public peers.
+    Checking the address we actually connected to (rather than resolving the
+    hostname up front) also covers redirects and DNS that changes between
+    lookups. Nothing has been sent yet when we hang up.
+    """
+    sock = socket.create_connection(address, *args, **kwargs)
+    peer = sock.getpeername()[0]
+    if not is_public_address(peer):
+        sock.close()
+        raise FetchError(f"Refusing to fetch from non-public address {peer}")
+    return sock
+
+
+class ConnectionPool:
+    """Keeps idle keep-alive connections around so we can reuse them per host"""
+
+    def __init__(self, max_idle_per_host=MAX_IDLE_CONNECTIONS_PER_HOST, timeout=TIMEOUT_SECONDS,
+                 allow_private=False):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.allow_private = allow_private
+        self._idle = {}   # (scheme, host, port) -> [connections]
+        self._lock = threading.Lock()
+
+    def get(self, scheme, host, port):
+        """Return (connection, reused) for a host"""
+        with self._lock:
+            idle = self._idle.get((scheme, host, port))
+            if idle:
+                return idle.pop(), True
+        return self.new_connection(scheme, host, port), False
+
+    def new_connection(self, scheme, host, port):
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        if not self.allow_private:
+            # http.client opens its socket through this hook (before any TLS handshake)
+            conn._create_connection = connect_public_only
+        return conn
+
+    def put(self, scheme, host, port, conn):
+        """Give a connection back once its response has been fully read"""
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host, port), [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+            self._idle = {}
+
+
+# ----- fetching -----
+
+class PageFetcher:
+    """Fetches pages through a shared connection pool and content cache"""
+
+    def __init__(self, max_parallel=MAX_PARALLEL_FETCHES, max_bytes=MAX_PAGE_BYTES,
+                 cache_size=CACHE_SIZE, deadline=PAGE_DEADLINE_SECONDS, allow_private=False):
+        self.pool = ConnectionPool(allow_private=allow_private)
+        self.max_parallel = max_parallel
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.cache_size = cache_size
+        self._cache = OrderedDict()   # url -> page dict from _read_page (complete pages only)
+        self._cache_lock = threading.Lock()
+
+    def fetch_many(self, urls, query):
+        """Fetch several pages at once; returns one result dict per url, in order"""
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            return list(executor.map(lambda url: self.fetch(url, query), urls))
+
+    def fetch(self, url, query):
+        """Fetch one page and return its title and the passages most relevant to query"""
+        try:
+            page = self._get_page(url)
+        except (FetchError, OSError, http.client.HTTPException, zlib.error, UnicodeError) as e:
+            return {"url": url, "error": str(e) or type(e).__name__}
+
+        return {
+            "url": url,
+            "title": page["title"],
+            "passages": top_passages(split_passages(page["paragraphs"]), query),
+            "truncated": not page["complete"],
+        }
+
+    def _get_page(self, url):
+        """Return the extracted page, from the cache when the server says it's unchanged"""
+        with self._cache_lock:
+            cached = self._cache.get(url)
+
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        page = self._request(url, headers)
+        if page.get("not_modified"):
+            if cached is None:
+                raise FetchError(f"Unexpected 304 Not Modified for {url}")
+            # A 304 may carry fresher validators; keep them for next time
+            page = dict(cached,
+                        etag=page["etag"] or cached["etag"],
+                        last_modified=page["last_modified"] or cached["last_modified"])
+
+        with self._cache_lock:
+            # Pages cut off at max_bytes are never cached, or a 304 would keep
+            # serving the truncated text as if it were the whole page
+            if page["complete"] and (page["etag"] or page["last_modified"]):
+                self._cache[url] = page
+                self._cache.move_to_end(url)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.pop(url, None)
+        return page
+
+    def _request(self, url, headers):
+        """GET a url, following redirects. A 304 Not Modified returns just its validators."""
+        deadline = time.monotonic() + self.deadline
+        for _ in range(MAX_REDIRECTS + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise FetchError(f"Gave up on {url} after {self.deadline}s")
+            try:
+                parts = urlsplit(url)
+                port = parts.port or (443 if parts.scheme == "https" else 80)
+            except ValueError:   # e.g. a non-numeric port or a broken [IPv6] host
+                raise FetchError(f"Unsupported URL: {url}") from None
+            if parts.scheme not in ("http", "https") or not parts.hostname:
+                raise FetchError(f"Unsupported URL: {url}")
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+
+            request_headers = {
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html, text/plain;q=0.9",
+                "Accept-Encoding": "gzip",
+                **headers,
+            }
+
+            # Connecting and waiting for headers count against the page deadline too
+            timeout = min(self.pool.timeout, remaining)
+            conn, sock, response = self._send(parts.scheme, parts.hostname, port, path,
+                                              request_headers, timeout)
+            location = response.getheader("Location")
+            if response.status in (301, 302, 303, 307, 308) and location:
+                self._finish(parts.scheme, parts.hostname, port, conn, response)
+                url = urljoin(url, location)
+                continue
+            if response.status == 304:
+                self._finish(parts.scheme, parts.hostname, port, conn, response)
+                return {
+                    "not_modified": True,
+                    "etag": response.getheader("ETag"),
+                    "last_modified": response.getheader("Last-Modified"),
+                }
+            if response.status != 200:
+                self._finish(parts.scheme, parts.hostname, port, conn, response)
+                raise FetchError(f"HTTP {response.status} for {url}")
+
+            try:
+                page, complete = self._read_page(sock, response, deadline)
+            except BaseException:
+                conn.close()   # unknown amount of body left unread, don't reuse it
+                raise
+            if complete:
+                self._finish(parts.scheme, parts.hostname, port, conn, response)
+            else:
+                conn.close()   # body was cut off, the connection can't be reused
+            return page
+
+        raise FetchError(f"Too many redirects for {url}")
+
+    def _send(self, scheme, host, port, path, headers, timeout):
+        """
+        Send a request on a pooled connection, retrying once if a reused one went stale.
+        Returns (connection, socket, response).
+        """
+        conn, reused = self.pool.get(scheme, host, port)
+        try:
+            return self._send_on(conn, path, headers, timeout)
+        except (http.client.RemoteDisconnected, ConnectionError, http.client.BadStatusLine):
+            conn.close()
+            if not reused:
+                raise
+        # The server closed an idle connection on us - try again on a fresh one
+        conn = self.pool.new_connection(scheme, host, port)
+        return self._send_on(conn, path, headers, timeout)
+
+    def _send_on(self, conn, path, headers, timeout):
+        conn.timeout = timeout          # used if the connection still has to connect
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        conn.request("GET", path, headers=headers)
+        # getresponse() sets conn.sock to None when the server will close the
+        # connection (HTTP/1.0, Connection: close), so hold on to the socket
+        sock = conn.sock
+        return conn, sock, conn.getresponse()
+
+    def _finish(self, scheme, host, port, conn, response):
+        """Drain a small response and hand the connection back to the pool"""
+        response.read()
+        if response.will_close or conn.sock is None:
+            conn.close()
+            return
+        # Undo any deadline-shortened timeout before someone else reuses it
+        conn.timeout = self.pool.timeout
+        conn.sock.settimeout(self.pool.timeout)
+        self.pool.put(scheme, host, port, conn)
+
+    def _read_page(self, sock, response, deadline):
+        """Stream the body into the text extractor. Returns (page, fully_read)."""
+        content_type = response.getheader("Content-Type", "text/html")
+        if not content_type.startswith(("text/html", "text/plain", "application/xhtml")):
+            raise FetchError(f"Not a text page ({content_type.split(';')[0]})")
+
+        charset = "utf-8"
+        if "charset=" in content_type:
+            charset = content_type.split("charset=")[-1].split(";")[0].strip().strip('"')
+        try:
+            decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        gzipped = response.getheader("Content-Encoding", "").lower() == "gzip"
+        unzip = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+        is_html = not content_type.startswith("text/plain")
+        extractor = TextExtractor()
+        plain_text = []
+
+        received = 0
+        complete = True
+        while True:
+            # A server that drips bytes slowly never trips the per-read timeout,
+            # so also shrink the timeout to whatever is left of the page deadline
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise FetchError(f"Page took longer than {self.deadline}s to download")
+            sock.settimeout(min(self.pool.timeout, remaining))
+            chunk = response.read1(READ_CHUNK_BYTES)   # whatever has arrived, up to a chunk
+            if not chunk:
+                break
+            if unzip:
+                chunk = unzip.decompress(chunk, self.max_bytes - received)
+            received += len(chunk)
+            text = decoder.decode(chunk)
+            if is_html:
+                extractor.feed(text)
+            else:
+                plain_text.append(text)
+            if received >= self.max_bytes:
+                complete = False
+                break
+
+        if is_html:
+            extractor.feed(decoder.decode(b"", final=True))
+            extractor.close()
+            title, paragraphs = extractor.title, extractor.paragraphs
+        else:
+            text = "".join(plain_text) + decoder.decode(b"", final=True)
+            title = ""
+            paragraphs = [" ".join(p.split()) for p in text.split("\n\n") if p.strip()]
+
+        return {
+            "etag": response.getheader("ETag"),
+            "last_modified": response.getheader("Last-Modified"),
+            "title": title,
+            "paragraphs": paragraphs,
+            "complete": complete,
+        }, complete
+
+    def close(self):
+        self.pool.close()
+
+
+# One shared fetcher so connections and cached pages are reused between calls
+_fetcher = PageFetcher()
+
+
+def fetch_page(urls, query):
+    """Fetch pages and return the passages most relevant to the query, as JSON"""
+    urls = list(dict.fromkeys(urls))[:5]
+    print(f"\n📄 Reading {len(urls)} page(s) for: '{query}'")
+
+    pages = _fetcher.fetch_many(urls, query)
+    for page in pages:
+        if "error" in page:
+            print(f"   ✗ {page['url']} ({page['error']})")
+        else:
+            note = ", cut off at size limit" if page["truncated"] else ""
+            print(f"   ✓ {page['title'] or page['url']} ({len(page['passages'])} passages{note})")
+    print()
+    return json.dumps(pages, indent=2)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print('Usage: python fetch_page.py "<question>" <url> [<url> ...]')
+        sys.exit(1)
+    print(fetch_page(sys.argv[2:], sys.argv[1]))
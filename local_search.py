@@ -0,0 +1,435 @@
+"""
+Local Search - Offline BM25 index for the agent's web_search tool
+Indexes local docs, tutorials and cached pages so the agent can still find
+real information when the web search is down (or skip the network entirely
+when the local corpus already has a good answer).
+
+Build an index:   python local_search.py build docs/
+Query it:         python local_search.py query "python list comprehension"
+"""
+
+from array import array
+import json
+import mmap
+import os
+import sys
+
+from dotenv import find_dotenv, load_dotenv
+
+from text_tools import BM25_K1, TextExtractor, bm25_idf, bm25_term_score, tokenize
+
+# Where the index lives on disk (override with LOCAL_SEARCH_INDEX in .env)
+DEFAULT_INDEX_DIR = "search_index"
+
+# File types we know how to index
+INDEXED_EXTENSIONS = {".md", ".txt", ".rst", ".html", ".htm"}
+
+# A result at least this confident (see search()) that matches every query
+# term is good enough to skip the web search. Chosen on the fixture pages
+# plus README.md: exact-topic hits like "git branches" score about 0.9, while
+# generic queries that merely mention README words, like "gemini api key
+# error", stay around 0.75. check_local_search.py keeps an eye on both.
+CONFIDENT_SCORE = 0.8
+
+# With a single query term confidence only measures how often the word
+# appears, so "python" looks like a perfect match for any page about Python.
+# Queries need at least this many terms before we trust the local index.
+MIN_CONFIDENT_TERMS = 2
+
+# How much text we keep per document for building result snippets
+STORED_TEXT_CHARS = 4000
+SNIPPET_CHARS = 240
+
+# Postings are stored as flat (doc_id, term_frequency) pairs of uint32
+POSTING_TYPECODE = "I"
+
+
+def html_to_text(html):
+    """Returns (title, visible_text) using the same extractor as the fetch_page tool"""
+    extractor = TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.title, "\n\n".join(extractor.paragraphs)
+
+
+class LocalSearchIndex:
+    """
+    An inverted index with BM25 ranking.
+
+    On disk the index is a directory with three files:
+    - postings.N.bin  all posting lists back to back, as uint32 (doc_id, tf) pairs
+    - lexicon.N.json  term -> [offset, number_of_docs] into postings.N.bin
+    - docs.json       per-document metadata (title, url, length, stored text)
+                      and the generation number N of the files above
+
+    Each save() writes a new generation and replaces docs.json last, so a
+    crash halfway through leaves the previous index intact.
+
+    The postings file is memory-mapped when loaded, so opening a big index is
+    instant and only the posting lists a query touches get paged in.
+    Documents added after loading go into a small in-memory segment that
+    is merged into a new postings file on the next save(). Replaced or removed
+    documents are only marked as deleted until then; save() drops them
+    and renumbers the rest.
+    """
+
+    def __init__(self, index_dir=None):
+        # Read the env var here, not at import time, so .env has been loaded by now
+        self.index_dir = index_dir or os.getenv("LOCAL_SEARCH_INDEX", DEFAULT_INDEX_DIR)
+        self.docs = []            # doc_id -> metadata dict
+        self.doc_lengths = array(POSTING_TYPECODE)
+        self.url_to_doc = {}      # url -> doc_id of the live version
+        self.deleted = set()      # doc_ids replaced or removed since the last save
+        self.live_docs = 0
+        self.total_length = 0
+
+        # On-disk segment (memory-mapped)
+        self._lexicon = {}
+        self._file = None
+        self._mmap = None
+        self._postings = None
+
+        # In-memory segment for documents added since the last save
+        self._pending = {}
+        self.generation = 0
+
+    # ----- building -----
+
+    def add_document(self, url, title, text, mtime=None):
+        """Index one document. Returns False if it is already up to date."""
+        existing = self.url_to_doc.get(url)
+        if existing is not None:
+            if mtime is not None and self.docs[existing].get("mtime") == mtime:
+                return False
+            self.remove_document(url)
+
+        doc_id = len(self.docs)
+        terms = tokenize(title + " " + text)
+
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            postings = self._pending.get(term)
+            if postings is None:
+                postings = self._pending[term] = array(POSTING_TYPECODE)
+            postings.append(doc_id)
+            postings.append(tf)
+
+        self.docs.append({
+            "url": url,
+            "title": title,
+            "text": text[:STORED_TEXT_CHARS],
+            "mtime": mtime,
+        })
+        self.doc_lengths.append(len(terms))
+        self.url_to_doc[url] = doc_id
+        self.live_docs += 1
+        self.total_length += len(terms)
+        return True
+
+    def remove_document(self, url):
+        """Mark a document as deleted (a tombstone) until the next save()"""
+        doc_id = self.url_to_doc.pop(url, None)
+        if doc_id is None:
+            return False
+        self.deleted.add(doc_id)
+        self.live_docs -= 1
+        self.total_length -= self.doc_lengths[doc_id]
+        return True
+
+    def add_file(self, path):
+        """Index a single text, markdown or HTML file"""
+        with open(path, encoding="utf-8", errors="replace") as f:
+            content = f.read()
+
+        if os.path.splitext(path)[1].lower() in (".html", ".htm"):
+            title, text = html_to_text(content)
+        else:
+            title, text = "", content.strip()
+            # Use the first heading or line as the title
+            for line in content.splitlines():
+                if line.strip():
+                    title = line.strip().lstrip("#").strip()
+                    break
+
+        url = "file://" + os.path.abspath(path)
+        return self.add_document(url, title or os.path.basename(path), text,
+                                 mtime=os.path.getmtime(path))
+
+    def add_directory(self, corpus_dir):
+        """
+        Bring the index in sync with a folder: index new and changed files
+        and drop files that no longer exist. Returns (indexed, removed).
+        """
+        indexed = 0
+        seen = set()
+        for root, _dirs, files in os.walk(corpus_dir):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in INDEXED_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    seen.add("file://" + os.path.abspath(path))
+                    if self.add_file(path):
+                        indexed += 1
+
+        prefix = "file://" + os.path.join(os.path.abspath(corpus_dir), "")
+        missing = [url for url in self.url_to_doc if url.startswith(prefix) and url not in seen]
+        for url in missing:
+            self.remove_document(url)
+        return indexed, len(missing)
+
+    # ----- saving and loading -----
+
+    def save(self):
+        """Merge everything into one compact on-disk segment, dropping deleted documents"""
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        terms = set(self._lexicon) | set(self._pending)
+        merged = {term: self._postings_for(term) for term in terms}
+        self._close_mmap()
+
+        # Renumber the live documents 0..n-1 so deleted ones leave no trace
+        new_ids = {}
+        for doc_id in range(len(self.docs)):
+            if doc_id not in self.deleted:
+                new_ids[doc_id] = len(new_ids)
+
+        generation = self.generation + 1
+        lexicon = {}
+        offset = 0
+        with open(self._path("postings", generation, ".bin"), "wb") as f:
+            for term in sorted(merged):
+                postings = self._drop_deleted(merged[term])
+                if not postings:
+                    continue
+                for i in range(0, len(postings), 2):
+                    postings[i] = new_ids[postings[i]]
+                postings.tofile(f)
+                lexicon[term] = [offset, len(postings) // 2]
+                offset += len(postings)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.docs = [self.docs[doc_id] for doc_id in new_ids]
+        self.doc_lengths = array(POSTING_TYPECODE, (self.doc_lengths[doc_id] for doc_id in new_ids))
+        self.url_to_doc = {doc["url"]: doc_id for doc_id, doc in enumerate(self.docs)}
+        self.deleted = set()
+
+        self._write_json(self._path("lexicon", generation, ".json"), lexicon)
+        # Writing docs.json is what makes the new generation live
+        self._write_json(os.path.join(self.index_dir, "docs.json"), {
+            "generation": generation,
+            "postings_length": offset,
+            "docs": self.docs,
+            "doc_lengths": self.doc_lengths.tolist(),
+        })
+        self._remove_old_generations(generation)
+
+        self.generation = generation
+        self._pending = {}
+        self._open_mmap(lexicon)
+
+    def load(self):
+        """Open an index saved with save(). Returns False if there is none."""
+        docs_path = os.path.join(self.index_dir, "docs.json")
+        if not os.path.exists(docs_path):
+            return False
+
+        with open(docs_path, encoding="utf-8") as f:
+            data = json.load(f)
+        generation = data["generation"]
+        with open(self._path("lexicon", generation, ".json"), encoding="utf-8") as f:
+            lexicon = json.load(f)
+
+        expected_size = data["postings_length"] * array(POSTING_TYPECODE).itemsize
+        if os.path.getsize(self._path("postings", generation, ".bin")) != expected_size:
+            raise ValueError("postings file does not match docs.json, rebuild the index")
+
+        self.docs = data["docs"]
+        self.doc_lengths = array(POSTING_TYPECODE, data["doc_lengths"])
+        self.url_to_doc = {doc["url"]: doc_id for doc_id, doc in enumerate(self.docs)}
+        self.deleted = set()
+        self.live_docs = len(self.docs)
+        self.total_length = sum(self.doc_lengths)
+
+        self.generation = generation
+        self._pending = {}
+        self._close_mmap()
+        self._open_mmap(lexicon)
+        return True
+
+    def close(self):
+        """Release the memory-mapped postings file"""
+        self._close_mmap()
+
+    def _path(self, name, generation, extension):
+        return os.path.join(self.index_dir, f"{name}.{generation}{extension}")
+
+    def _write_json(self, path, data):
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _remove_old_generations(self, generation):
+        keep = {f"postings.{generation}.bin", f"lexicon.{generation}.json"}
+        for name in os.listdir(self.index_dir):
+            if name.startswith(("postings.", "lexicon.")) and name not in keep:
+                try:
+                    os.remove(os.path.join(self.index_dir, name))
+                except OSError:
+                    pass  # still open in another process (Windows), clean up next time
+
+    def _open_mmap(self, lexicon):
+        self._lexicon = lexicon
+        path = self._path("postings", self.generation, ".bin")
+        if not os.path.getsize(path):
+            return  # mmap can't map an empty file
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._postings = memoryview(self._mmap).cast(POSTING_TYPECODE)
+
+    def _close_mmap(self):
+        if self._postings is not None:
+            self._postings.release()
+            self._mmap.close()
+            self._file.close()
+        self._lexicon = {}
+        self._file = self._mmap = self._postings = None
+
+    # ----- searching -----
+
+    def _postings_for(self, term):
+        """All (doc_id, tf) pairs for a term, from disk and memory"""
+        postings = array(POSTING_TYPECODE)
+        entry = self._lexicon.get(term)
+        if entry is not None:
+            offset, n_docs = entry
+            postings.frombytes(self._postings[offset:offset + 2 * n_docs].tobytes())
+        pending = self._pending.get(term)
+        if pending is not None:
+            postings.extend(pending)
+        return postings
+
+    def _drop_deleted(self, postings):
+        if not self.deleted:
+            return postings
+        kept = array(POSTING_TYPECODE)
+        for i in range(0, len(postings), 2):
+            if postings[i] not in self.deleted:
+                kept.append(postings[i])
+                kept.append(postings[i + 1])
+        return kept
+
+    def search(self, query, max_results=5):
+        """
+        Rank documents against a query with BM25.
+        Each result has title, snippet, url, score, coverage (the fraction
+        of query terms that appear in that document) and confidence.
+
+        confidence is the score divided by the best score any document
+        could get for this query (every term matched, term frequency
+        saturated), so it is between 0 and 1 whatever the corpus size or
+        query length. Query terms the index has never seen count against it.
+        """
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms or not self.live_docs:
+            return []
+
+        avg_length = self.total_length / self.live_docs
+        scores = {}
+        matched = {}
+        max_score = 0.0
+        for term in query_terms:
+            postings = self._drop_deleted(self._postings_for(term))
+            n_docs = len(postings) // 2
+            idf = bm25_idf(self.live_docs, n_docs)
+            max_score += idf * (BM25_K1 + 1)
+            if not n_docs:
+                continue
+            for doc_id, tf in zip(postings[::2], postings[1::2]):
+                score = bm25_term_score(tf, idf, self.doc_lengths[doc_id], avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+                matched[doc_id] = matched.get(doc_id, 0) + 1
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:max_results]
+        results = []
+        for doc_id in ranked:
+            doc = self.docs[doc_id]
+            results.append({
+                "title": doc["title"],
+                "snippet": make_snippet(doc["text"], query_terms),
+                "url": doc["url"],
+                "score": round(scores[doc_id], 3),
+                "coverage": matched[doc_id] / len(query_terms),
+                "confidence": round(scores[doc_id] / max_score, 3),
+            })
+        return results
+
+
+def make_snippet(text, query_terms):
+    """Cut a short window of text around the first query term we find"""
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in query_terms]
+    positions = [p for p in positions if p >= 0]
+    start = max(0, min(positions) - SNIPPET_CHARS // 4) if positions else 0
+    snippet = " ".join(text[start:start + SNIPPET_CHARS].split())
+    if start > 0:
+        snippet = "..." + snippet
+    if start + SNIPPET_CHARS < len(text):
+        snippet += "..."
+    return snippet
+
+
+def is_confident(result, query):
+    """True when a search() result is good enough to skip the web search"""
+    return (len(set(tokenize(query))) >= MIN_CONFIDENT_TERMS
+            and result["coverage"] == 1.0
+            and result["confidence"] >= CONFIDENT_SCORE)
+
+
+def open_index(index_dir=None):
+    """Load the local index if one has been built, otherwise return None"""
+    index = LocalSearchIndex(index_dir)
+    try:
+        if index.load():
+            return index
+    except (OSError, ValueError, KeyError) as e:
+        print(f"   (Local search index unavailable: {e})")
+    return None
+
+
+def main(argv):
+    """Tiny command line: build an index from a folder, or query it"""
+    if len(argv) < 2 or argv[0] not in ("build", "query"):
+        print("Usage:")
+        print("  python local_search.py build <corpus_dir> [<corpus_dir> ...]")
+        print('  python local_search.py query "<search terms>"')
+        return 1
+
+    load_dotenv(find_dotenv(usecwd=True))  # Pick up LOCAL_SEARCH_INDEX from .env
+    index = LocalSearchIndex()
+    index.load()
+
+    if argv[0] == "build":
+        indexed = removed = 0
+        for corpus_dir in argv[1:]:
+            counts = index.add_directory(corpus_dir)
+            indexed += counts[0]
+            removed += counts[1]
+        index.save()
+        print(f"✓ Indexed {indexed} new or changed files, removed {removed} "
+              f"({index.live_docs} documents total)")
+    else:
+        for i, result in enumerate(index.search(" ".join(argv[1:])), 1):
+            print(f"{i}. {result['title']}  (score {result['score']})")
+            print(f"   {result['url']}")
+            print(f"   {result['snippet']}\n")
+
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
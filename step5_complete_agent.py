@@ -8,6 +8,8 @@ from duckduckgo_search import DDGS
 import json
 from dotenv import load_dotenv
 import os
+from local_search import is_confident, open_index
+from fetch_page import fetch_page
 
 load_dotenv()  # Load environment variables from .env file
 
@@ -16,71 +18,73 @@ API_KEY = os.getenv("GEMINI_API_KEY")  # Replace with your key
 genai.configure(api_key=API_KEY)
 
 
+# Offline search index over local docs and cached pages
+# (build it with: python local_search.py build docs/)
+local_index = open_index()
+
+
+def local_search(query):
+    """Search the local index (returns [] if no index has been built)"""
+    if local_index is None:
+        return []
+    return [
+        {
+            "title": result["title"],
+            "snippet": result["snippet"],
+            "url": result["url"],
+            # Skip the network only when a result matches every query term strongly
+            "confident": is_confident(result, query),
+        }
+        for result in local_index.search(query, max_results=5)
+    ]
+
+
 def web_search(query):
     """Search the web for current information"""
     print(f"\n🔍 Searching the web for: '{query}'")
     
+    # First tier: answer from the local index if it's a strong match
+    local_results = local_search(query)
+    if local_results and local_results[0]["confident"]:
+        print("   (Strong match in local index - skipping web search)")
+        return format_results(local_results)
+    
     try:
         results = DDGS().text(query, max_results=5)
         
         search_results = []
-        for i, result in enumerate(results, 1):
+        for result in results:
             search_results.append({
                 "title": result.get("title", ""),
                 "snippet": result.get("body", ""),
                 "url": result.get("href", "")
             })
-            print(f"   {i}. {result.get('title', 'N/A')}")
-        
-        # If no results, use mock data for demo
-        if not search_results:
-            print(f"   (Real search unavailable - using demo results)")
-            search_results = [
-                {
-                    "title": "Latest AI Developments: Google DeepMind Announces Breakthrough",
-                    "snippet": "Google DeepMind has announced significant advances in large language models, improving reasoning capabilities by 40% and reducing hallucinations through a new technique called 'grounded generation'.",
-                    "url": "https://example.com/ai-news-1"
-                },
-                {
-                    "title": "OpenAI Releases GPT-5 with Enhanced Multimodal Capabilities",
-                    "snippet": "OpenAI's latest model shows remarkable improvements in code generation and mathematical reasoning. The model can now process video input in real-time and generate more accurate responses.",
-                    "url": "https://example.com/ai-news-2"
-                },
-                {
-                    "title": "New Study Shows AI Models Improving in Scientific Research",
-                    "snippet": "Researchers demonstrate that modern LLMs can assist in drug discovery and materials science, cutting research time by up to 60% in initial hypothesis generation.",
-                    "url": "https://example.com/ai-news-3"
-                }
-            ]
-            for i, result in enumerate(search_results, 1):
-                print(f"   {i}. {result['title']}")
         
-        print(f"✓ Found {len(search_results)} results\n")
-        return json.dumps(search_results, indent=2)
+        if search_results:
+            return format_results(search_results)
+        print("   (No web results - using local index)")
     
     except Exception as e:
-        print(f"   (Search error: {str(e)}, using demo results)")
-        mock_results = [
-            {
-                "title": "Tech News: Latest Programming Trends",
-                "snippet": "Python continues to dominate in data science and AI development. New frameworks are making AI development more accessible to developers.",
-                "url": "https://example.com/tech-news-1"
-            },
-            {
-                "title": "AI Research Breakthroughs in 2025",
-                "snippet": "Major advancements in natural language processing and computer vision are transforming how we interact with technology.",
-                "url": "https://example.com/tech-news-2"
-            },
-            {
-                "title": "GitHub Copilot and AI Coding Assistants on the Rise",
-                "snippet": "AI-powered coding tools are becoming essential for developers, with studies showing 30% improvement in coding speed.",
-                "url": "https://example.com/tech-news-3"
-            }
-        ]
-        for i, result in enumerate(mock_results, 1):
-            print(f"   {i}. {result['title']}")
-        print(f"✓ Found {len(mock_results)} results (demo mode)\n")
-        return json.dumps(mock_results, indent=2)
+        print(f"   (Search error: {str(e)}, using local index)")
+    
+    # Fallback: whatever the local index found, even weak matches
+    if local_results:
+        return format_results(local_results)
+    
+    print("✗ No results found\n")
+    return json.dumps({"error": "Search is unavailable and the local index has no matches."})
+
+
+def format_results(search_results):
+    """Print the results and turn them into JSON for the model"""
+    search_results = [
+        {"title": r["title"], "snippet": r["snippet"], "url": r["url"]}
+        for r in search_results
+    ]
+    for i, result in enumerate(search_results, 1):
+        print(f"   {i}. {result['title'] or 'N/A'}")
+    print(f"✓ Found {len(search_results)} results\n")
+    return json.dumps(search_results, indent=2)
 
 
 # Define the tool for Gemini
@@ -99,6 +103,25 @@ web_search_tool = genai.protos.Tool(
                 },
                 required=["query"]
             )
+        ),
+        genai.protos.FunctionDeclaration(
+            name="fetch_page",
+            description="Read the pages behind web_search results. Returns the passages from each page that are most relevant to the question. Use this when the search snippets don't have enough detail.",
+            parameters=genai.protos.Schema(
+                type=genai.protos.Type.OBJECT,
+                properties={
+                    "urls": genai.protos.Schema(
+                        type=genai.protos.Type.ARRAY,
+                        items=genai.protos.Schema(type=genai.protos.Type.STRING),
+                        description="Up to 5 page URLs, usually taken from web_search results"
+                    ),
+                    "query": genai.protos.Schema(
+                        type=genai.protos.Type.STRING,
+                        description="What you are looking for on these pages"
+                    )
+                },
+                required=["urls", "query"]
+            )
         )
     ]
 )
@@ -130,6 +153,7 @@ class TechAssistantAgent:
         - Be friendly and encouraging
         - Keep explanations clear and concise
         - Use web_search when you need current information or recent news
+        - Use fetch_page to read the most promising results when the snippets aren't enough
         - Provide practical, actionable advice
         """
         
@@ -175,6 +199,22 @@ class TechAssistantAgent:
                             )]
                         )
                     )
+                elif function_call.name == "fetch_page":
+                    # Read the pages and keep only the relevant passages
+                    urls = list(function_call.args["urls"])
+                    query = function_call.args["query"]
+                    page_results = fetch_page(urls, query)
+                    
+                    response = chat.send_message(
+                        genai.protos.Content(
+                            parts=[genai.protos.Part(
+                                function_response=genai.protos.FunctionResponse(
+                                    name="fetch_page",
+                                    response={"result": page_results}
+                                )
+                            )]
+                        )
+                    )
                 else:
                     break
             else:
@@ -0,0 +1,105 @@
+"""
+Text Tools - Text helpers shared by local_search.py and fetch_page.py
+Tokenizing, BM25 scoring and HTML-to-text extraction live here so the
+search index and the page fetcher rank and read text the same way.
+"""
+
+from html.parser import HTMLParser
+import math
+import re
+
+# BM25 tuning knobs (the usual textbook defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Tags whose text is never part of the main content
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header",
+             "footer", "aside", "form", "button", "select", "iframe"}
+
+# Tags that start a new paragraph
+BLOCK_TAGS = {"p", "div", "br", "li", "ul", "ol", "pre", "blockquote", "table",
+              "tr", "td", "th", "section", "article", "main", "dd", "dt",
+              "h1", "h2", "h3", "h4", "h5", "h6"}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how",
+    "in", "is", "it", "of", "on", "or", "that", "the", "this", "to", "was",
+    "what", "when", "where", "which", "who", "why", "with",
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+def tokenize(text):
+    """Split text into lowercase search terms, dropping stopwords"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def bm25_idf(total_docs, doc_freq):
+    """How rare a term is: terms found in fewer documents count for more"""
+    return math.log(1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+
+def bm25_term_score(tf, idf, doc_length, avg_length):
+    """One term's BM25 contribution to a document's score"""
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_length / avg_length)
+    return idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+
+class TextExtractor(HTMLParser):
+    """
+    Streaming HTML-to-text converter.
+    Feed it chunks as they arrive; it keeps only the title and a list of
+    paragraphs, skipping scripts, navigation, footers and similar clutter.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.paragraphs = []
+        self._current = []
+        self._skip_depth = 0
+        self._in_title = False
+        self._in_body = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "body":
+            self._in_body = True
+        elif tag == "title":
+            # Only the document's own <title>, not e.g. <svg><title> icons in the body
+            self._in_title = not self._skip_depth and not self._in_body
+        elif tag in BLOCK_TAGS:
+            self._end_paragraph()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._end_paragraph()
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags like <br/> never contain text
+        if tag in BLOCK_TAGS:
+            self._end_paragraph()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._current.append(data)
+
+    def _end_paragraph(self):
+        text = " ".join("".join(self._current).split())
+        self._current = []
+        # Very short fragments are usually menus, buttons or labels
+        if len(text.split()) >= 4:
+            self.paragraphs.append(text)
+
+    def close(self):
+        super().close()
+        self._end_paragraph()
+        self.title = " ".join(self.title.split())